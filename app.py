@@ -1,12 +1,26 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, g
 from flask_login import LoginManager, login_required, current_user
-from models import db, Customer, Account, Transaction, Branch, AuditLog, RecoveryLog
-from auth import auth as auth_blueprint
-from sqlalchemy import text
+from models import db, Customer, Account, Transaction, Branch, AuditLog, RecoveryLog, CustomerBalance
+from auth import auth as auth_blueprint, limiter, cache
+from sqlalchemy import text, func, select, union
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from sqlalchemy.orm import joinedload, aliased, load_only
+from werkzeug.middleware.proxy_fix import ProxyFix
+import click
+import math
 import os
+from decimal import Decimal, ROUND_HALF_UP
 
 app = Flask(__name__)
 
+# Behind a reverse proxy (Render sets TRUSTED_PROXY_COUNT=1 in render.yaml),
+# take the client address from X-Forwarded-For so rate limits are per client.
+# Off by default: without a proxy, clients could spoof the header.
+trusted_proxies = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+if trusted_proxies:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'postgresql://localhost/banking_system')
@@ -16,11 +30,28 @@ if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres://'):
     app.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI'].replace('postgres://', 'postgresql://', 1)
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['ITEMS_PER_PAGE'] = 50
+app.config['RATELIMIT_STORAGE_URI'] = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'SimpleCache')
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
+    # Batch executemany INSERTs into multi-row VALUES and UPDATE/DELETEs via execute_batch
+    'executemany_mode': 'values_plus_batch',
+    'insertmanyvalues_page_size': 1000,
 }
 
+# Behind PgBouncer the bouncer owns pooling, so don't hold connections in-process
+if os.environ.get('PGBOUNCER') == '1':
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'] = NullPool
+else:
+    # Per gunicorn worker; pool_size should cover gunicorn.conf.py's threads
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+    })
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager()
@@ -28,13 +59,95 @@ login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
 login_manager.init_app(app)
+limiter.init_app(app)
+cache.init_app(app)
 
 # Register blueprints
 app.register_blueprint(auth_blueprint)
 
+# Report lazy loads inside loops during development (requires nplusone)
+if os.environ.get('NPLUSONE') == '1':
+    from nplusone.ext.flask_sqlalchemy import NPlusOne
+    NPlusOne(app)
+
 @login_manager.user_loader
 def load_user(customer_id):
-    return Customer.query.get(int(customer_id))
+    customer_id = int(customer_id)
+    user = g.get('_user')
+    if user is not None and user.customer_id == customer_id:
+        return user
+    # session.get checks the identity map before issuing a SELECT; only the
+    # columns views read from current_user are loaded (not password_hash)
+    g._user = db.session.get(Customer, customer_id, options=[
+        load_only(Customer.customer_id, Customer.first_name, Customer.last_name, Customer.is_active)
+    ])
+    return g._user
+
+# Current user's accounts, loaded once per request and cached on g
+def _user_accounts():
+    if 'accounts' not in g:
+        g.accounts = Account.query.options(
+            joinedload(Account.branch)
+        ).filter_by(customer_id=current_user.customer_id).all()
+    return g.accounts
+
+# Format an amount stored in cents as dollars, e.g. 150050 -> '1500.50'
+@app.template_filter('money')
+def money_filter(cents):
+    return f'{(cents or 0) / 100:.2f}'
+
+# Convert an entered dollar amount to whole cents (half-up, decimally, so
+# 10.005 -> 1001); the single conversion before anything reaches the database
+def _to_cents(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+# transfer_funds locks both accounts in account_id order, so deadlocks should
+# not occur; the retry is only a fallback if one still does
+MAX_TRANSFER_RETRIES = 3
+
+def _is_concurrency_conflict(error):
+    # 40P01 deadlock_detected
+    return getattr(error.orig, 'pgcode', None) == '40P01'
+
+# Flat transaction rows with both account numbers joined in, for read-only
+# list views that do not need ORM instances
+def _transaction_rows(criterion):
+    sender = aliased(Account)
+    receiver = aliased(Account)
+    return db.session.query(
+        Transaction.transaction_id,
+        Transaction.transaction_type,
+        Transaction.amount,
+        Transaction.transaction_date,
+        Transaction.description,
+        Transaction.status,
+        sender.account_number.label('sender_account_number'),
+        sender.customer_id.label('sender_customer_id'),
+        receiver.account_number.label('receiver_account_number'),
+        receiver.customer_id.label('receiver_customer_id')
+    ).outerjoin(
+        sender, Transaction.sender_account_id == sender.account_id
+    ).outerjoin(
+        receiver, Transaction.receiver_account_id == receiver.account_id
+    ).filter(criterion).order_by(Transaction.transaction_date.desc())
+
+# Ids of the newest transactions touching the given accounts. Each side of the
+# sender/receiver OR is its own top-k leg so it can be read pre-sorted from the
+# (account_id, transaction_date DESC) indexes instead of scanning and sorting.
+def _recent_transaction_ids(account_ids, limit):
+    legs = [
+        select(Transaction.transaction_id, Transaction.transaction_date)
+        .where(column.in_(account_ids))
+        .order_by(Transaction.transaction_date.desc())
+        .limit(limit)
+        for column in (Transaction.sender_account_id, Transaction.receiver_account_id)
+    ]
+    # UNION rather than UNION ALL: transfers between the user's own accounts
+    # appear in both legs
+    recent = union(*legs).subquery()
+    return select(recent.c.transaction_id).order_by(
+        recent.c.transaction_date.desc()
+    ).limit(limit)
 
 # Home route
 @app.route('/')
@@ -47,16 +160,18 @@ def index():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    accounts = Account.query.filter_by(customer_id=current_user.customer_id).all()
+    accounts = _user_accounts()
     
     # Get recent transactions
-    recent_transactions = Transaction.query.filter(
-        (Transaction.sender_account_id.in_([a.account_id for a in accounts])) |
-        (Transaction.receiver_account_id.in_([a.account_id for a in accounts]))
-    ).order_by(Transaction.transaction_date.desc()).limit(10).all()
+    recent_ids = _recent_transaction_ids([a.account_id for a in accounts], 10)
+    recent_transactions = _transaction_rows(
+        Transaction.transaction_id.in_(recent_ids)
+    ).all()
     
     # Calculate total balance
-    total_balance = sum(account.balance for account in accounts)
+    total_balance = db.session.query(
+        func.coalesce(func.sum(Account.balance), 0)
+    ).filter_by(customer_id=current_user.customer_id).scalar()
     
     return render_template('dashboard.html', 
                          accounts=accounts, 
@@ -67,7 +182,7 @@ def dashboard():
 @app.route('/transfer', methods=['GET', 'POST'])
 @login_required
 def transfer():
-    accounts = Account.query.filter_by(customer_id=current_user.customer_id, status='ACTIVE').all()
+    accounts = [a for a in _user_accounts() if a.status == 'ACTIVE']
     
     if request.method == 'POST':
         sender_account_id = request.form.get('sender_account_id', type=int)
@@ -79,59 +194,90 @@ def transfer():
             flash('All fields are required.', 'danger')
             return redirect(url_for('transfer'))
         
-        if amount <= 0:
+        # float() accepts 'nan' and 'inf', which cannot be converted to cents
+        if not math.isfinite(amount):
+            flash('Invalid transfer amount.', 'danger')
+            return redirect(url_for('transfer'))
+        
+        # Balances are stored in cents; check the converted amount so values
+        # that round to 0 cents (e.g. 0.004) are rejected here
+        amount_cents = _to_cents(amount)
+        if amount_cents <= 0:
             flash('Transfer amount must be greater than zero.', 'danger')
             return redirect(url_for('transfer'))
         
         # Check sender account belongs to current user
-        sender_account = Account.query.filter_by(
-            account_id=sender_account_id,
-            customer_id=current_user.customer_id
-        ).first()
+        sender_account = next(
+            (a for a in _user_accounts() if a.account_id == sender_account_id),
+            None
+        )
         
         if not sender_account:
             flash('Invalid sender account.', 'danger')
             return redirect(url_for('transfer'))
         
-        # Find receiver account
-        receiver_account = Account.query.filter_by(account_number=receiver_account_number).first()
+        # Reject obvious overdrafts before taking row locks in transfer_funds;
+        # the stored procedure still enforces this under concurrent updates
+        if amount_cents > sender_account.balance:
+            flash(f'Insufficient funds in account {sender_account.account_number}. '
+                  f'Available: ${sender_account.balance / 100:.2f}', 'danger')
+            return redirect(url_for('transfer'))
+        
+        # Find receiver account (only its id is needed)
+        receiver_account_id = db.session.query(Account.account_id).filter_by(
+            account_number=receiver_account_number
+        ).scalar()
         
-        if not receiver_account:
+        if not receiver_account_id:
             flash('Receiver account not found.', 'danger')
             return redirect(url_for('transfer'))
         
-        if sender_account.account_id == receiver_account.account_id:
+        if sender_account.account_id == receiver_account_id:
             flash('Cannot transfer to the same account.', 'danger')
             return redirect(url_for('transfer'))
         
-        # Call stored procedure for transfer
+        # Call stored procedure for transfer inside a SAVEPOINT so a failure
+        # only unwinds the transfer and the recovery log shares the outer commit.
+        # A deadlock on the account rows is retried a few times as a fallback.
+        retries = 0
         try:
-            result = db.session.execute(
-                text('SELECT transfer_funds(:sender, :receiver, :amount)'),
-                {
-                    'sender': sender_account_id,
-                    'receiver': receiver_account.account_id,
-                    'amount': amount
-                }
-            )
+            while True:
+                try:
+                    with db.session.begin_nested():
+                        result = db.session.execute(
+                            text('SELECT transfer_funds(:sender, :receiver, :amount)'),
+                            {
+                                'sender': sender_account_id,
+                                'receiver': receiver_account_id,
+                                'amount': amount_cents
+                            }
+                        )
+                    break
+                except OperationalError as e:
+                    if retries >= MAX_TRANSFER_RETRIES or not _is_concurrency_conflict(e):
+                        raise
+                    retries += 1
             db.session.commit()
             flash('Transfer completed successfully!', 'success')
             return redirect(url_for('dashboard'))
         except Exception as e:
+            # Failures outside the SAVEPOINT (e.g. the outer commit) leave the
+            # session aborted; reset it before writing the recovery log
             db.session.rollback()
             error_message = str(e)
-            
+
             # Log the failure in recovery_logs
             recovery_log = RecoveryLog(
                 operation_type='TRANSFER',
                 sender_account_id=sender_account_id,
-                receiver_account_id=receiver_account.account_id,
-                attempted_amount=amount,
+                receiver_account_id=receiver_account_id,
+                attempted_amount=amount_cents,
                 failure_reason=error_message,
                 sender_balance_at_failure=sender_account.balance,
+                retry_count=retries,
                 additional_details={
                     'sender_account': sender_account.account_number,
-                    'receiver_account': receiver_account.account_number,
+                    'receiver_account': receiver_account_number,
                     'user_id': current_user.customer_id
                 }
             )
@@ -152,20 +298,35 @@ def transfer():
 @app.route('/simulate_failure')
 @login_required
 def simulate_failure():
-    # Get user's first account
-    account = Account.query.filter_by(customer_id=current_user.customer_id).first()
+    # Get user's first account and another account to transfer to in one query
+    account = db.session.execute(
+        text('''
+            WITH mine AS (
+                SELECT account_id, account_number, balance
+                FROM accounts
+                WHERE customer_id = :customer_id
+                LIMIT 1
+            )
+            SELECT m.account_id, m.account_number, m.balance,
+                   o.account_id AS receiver_account_id,
+                   o.account_number AS receiver_account_number
+            FROM mine m
+            LEFT JOIN accounts o ON o.account_id <> m.account_id
+            LIMIT 1
+        '''),
+        {'customer_id': current_user.customer_id}
+    ).first()
     
     if not account:
         flash('You need at least one account to simulate a transfer failure.', 'warning')
         return redirect(url_for('dashboard'))
     
-    # Try to transfer more than the account balance
-    excessive_amount = float(account.balance) + 5000.00
+    # Try to transfer $5000 more than the account balance (amounts in cents)
+    excessive_cents = account.balance + 500000
+    balance = account.balance / 100
+    excessive_amount = excessive_cents / 100
     
-    # Find another account to transfer to
-    receiver_account = Account.query.filter(Account.account_id != account.account_id).first()
-    
-    if not receiver_account:
+    if not account.receiver_account_id:
         flash('No receiver account available for simulation.', 'warning')
         return redirect(url_for('dashboard'))
     
@@ -175,8 +336,8 @@ def simulate_failure():
             text('SELECT transfer_funds(:sender, :receiver, :amount)'),
             {
                 'sender': account.account_id,
-                'receiver': receiver_account.account_id,
-                'amount': excessive_amount
+                'receiver': account.receiver_account_id,
+                'amount': excessive_cents
             }
         )
         db.session.commit()
@@ -189,14 +350,14 @@ def simulate_failure():
         recovery_log = RecoveryLog(
             operation_type='TRANSFER',
             sender_account_id=account.account_id,
-            receiver_account_id=receiver_account.account_id,
-            attempted_amount=excessive_amount,
-            failure_reason=f'Insufficient funds. Available: {account.balance}, Required: {excessive_amount}, Shortfall: {excessive_amount - float(account.balance)}',
+            receiver_account_id=account.receiver_account_id,
+            attempted_amount=excessive_cents,
+            failure_reason=f'Insufficient funds. Available: {balance:.2f}, Required: {excessive_amount:.2f}, Shortfall: {excessive_amount - balance:.2f}',
             sender_balance_at_failure=account.balance,
             additional_details={
                 'sender_account': account.account_number,
-                'receiver_account': receiver_account.account_number,
-                'deficit_amount': float(excessive_amount - float(account.balance)),
+                'receiver_account': account.receiver_account_number,
+                'deficit_amount': excessive_amount - balance,
                 'error_message': str(e)
             }
         )
@@ -206,7 +367,7 @@ def simulate_failure():
             db.session.commit()
             
             flash('✓ Failure simulation successful! The transaction was rolled back.', 'success')
-            flash(f'Attempted to transfer ${excessive_amount:.2f} from account with balance ${account.balance:.2f}', 'info')
+            flash(f'Attempted to transfer ${excessive_amount:.2f} from account with balance ${balance:.2f}', 'info')
             flash(f'Recovery log created with ID: {recovery_log.recovery_id}. Check the table below for details.', 'success')
         except Exception as log_error:
             db.session.rollback()
@@ -219,62 +380,110 @@ def simulate_failure():
 @app.route('/accounts')
 @login_required
 def accounts():
-    user_accounts = Account.query.filter_by(customer_id=current_user.customer_id).all()
+    user_accounts = _user_accounts()
     return render_template('accounts.html', accounts=user_accounts)
 
 # View transactions
 @app.route('/transactions')
 @login_required
 def transactions():
-    user_accounts = Account.query.filter_by(customer_id=current_user.customer_id).all()
-    account_ids = [a.account_id for a in user_accounts]
+    # Resolve the user's account ids server-side instead of shipping an IN list
+    account_ids = db.session.query(Account.account_id).filter_by(
+        customer_id=current_user.customer_id
+    ).scalar_subquery()
     
-    all_transactions = Transaction.query.filter(
+    pagination = _transaction_rows(
         (Transaction.sender_account_id.in_(account_ids)) |
         (Transaction.receiver_account_id.in_(account_ids))
-    ).order_by(Transaction.transaction_date.desc()).all()
+    ).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ITEMS_PER_PAGE'],
+        error_out=False
+    )
     
-    return render_template('transactions.html', transactions=all_transactions, user_accounts=user_accounts)
+    return render_template('transactions.html',
+                         transactions=pagination.items,
+                         pagination=pagination)
 
 # View audit logs
 @app.route('/audit_logs')
 @login_required
 def audit_logs():
-    user_accounts = Account.query.filter_by(customer_id=current_user.customer_id).all()
-    account_ids = [a.account_id for a in user_accounts]
+    account_ids = db.session.query(Account.account_id).filter_by(
+        customer_id=current_user.customer_id
+    ).scalar_subquery()
     
-    logs = AuditLog.query.filter(AuditLog.account_id.in_(account_ids)).order_by(AuditLog.changed_at.desc()).all()
+    pagination = AuditLog.query.filter(AuditLog.account_id.in_(account_ids)).order_by(AuditLog.changed_at.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ITEMS_PER_PAGE'],
+        error_out=False
+    )
     
-    return render_template('audit_logs.html', logs=logs)
+    return render_template('audit_logs.html', logs=pagination.items, pagination=pagination)
 
 # View recovery logs (admin view - showing all for demonstration)
 @app.route('/recovery_logs')
 @login_required
 def recovery_logs():
-    logs = RecoveryLog.query.order_by(RecoveryLog.failed_at.desc()).all()
-    return render_template('recovery_logs.html', logs=logs)
+    pagination = RecoveryLog.query.order_by(RecoveryLog.failed_at.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ITEMS_PER_PAGE'],
+        error_out=False
+    )
+    return render_template('recovery_logs.html', logs=pagination.items, pagination=pagination)
 
 # View customer financial overview
 @app.route('/reports/customer_overview')
 @login_required
 def customer_overview():
-    result = db.session.execute(text('SELECT * FROM customer_financial_overview'))
-    customers = result.fetchall()
+    # Stream rows through a server-side cursor instead of materializing the view
+    customers = db.session.execute(
+        text('SELECT * FROM customer_financial_overview').execution_options(
+            stream_results=True, yield_per=500
+        )
+    ).mappings()
     return render_template('customer_overview.html', customers=customers)
 
 # View branch transaction summary
 @app.route('/reports/branch_summary')
 @login_required
 def branch_summary():
-    result = db.session.execute(text('SELECT * FROM branch_transaction_summary'))
-    branches = result.fetchall()
+    branches = db.session.execute(
+        text('SELECT * FROM branch_transaction_summary').execution_options(
+            stream_results=True, yield_per=500
+        )
+    ).mappings()
     return render_template('branch_summary.html', branches=branches)
 
+# Refresh the customer balance summary behind the reports; scheduled as a
+# cron job in render.yaml
+@app.cli.command('refresh-balances')
+def refresh_balances():
+    CustomerBalance.refresh()
+    print('mv_customer_balance refreshed')
+
+# Create monthly partitions for transactions and audit_logs from last month
+# onwards; schedule monthly so new rows never fall into the DEFAULT partition
+@app.cli.command('create-partitions')
+@click.option('--months', default=3, show_default=True, help='Months ahead to create, after the current one')
+def create_partitions(months):
+    for table in ('transactions', 'audit_logs'):
+        db.session.execute(
+            text("SELECT create_monthly_partitions(:table, (CURRENT_DATE - INTERVAL '1 month')::DATE, :count)"),
+            {'table': table, 'count': months + 2}
+        )
+    db.session.commit()
+    print(f'Partitions ensured through {months} month(s) ahead')
+
 # API endpoints for AJAX calls
 @app.route('/api/account/<account_number>')
 @login_required
 def get_account_info(account_number):
-    account = Account.query.filter_by(account_number=account_number).first()
+    # Fetch customer and branch in the same query instead of lazy-loading each
+    account = Account.query.options(
+        joinedload(Account.customer).load_only(Customer.first_name, Customer.last_name),
+        joinedload(Account.branch).load_only(Branch.branch_name)
+    ).filter_by(account_number=account_number).first()
     if account:
         return jsonify({
             'success': True,
@@ -1,10 +1,26 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_caching import Cache
 from models import db, Customer, Branch
 from datetime import datetime
 
 auth = Blueprint('auth', __name__)
+limiter = Limiter(key_func=get_remote_address)
+cache = Cache()
+
+PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+# Checked against when the email is unknown so both login branches cost one hash
+DUMMY_PASSWORD_HASH = generate_password_hash('dummy-password', method=PASSWORD_HASH_METHOD)
+
+# Branch list for the signup dropdown; branches rarely change, so cache it.
+# Call cache.delete_memoized(get_branches) after creating or renaming a branch.
+@cache.memoize(timeout=600)
+def get_branches():
+    return [branch.to_dict() for branch in Branch.query.all()]
 
 @auth.route('/signup', methods=['GET', 'POST'])
 def signup():
@@ -36,13 +52,13 @@ def signup():
             return redirect(url_for('auth.signup'))
         
         # Check if user already exists
-        existing_user = Customer.query.filter_by(email=email).first()
+        existing_user = db.session.query(Customer.customer_id).filter_by(email=email).scalar()
         if existing_user:
             flash('Email address already registered. Please login instead.', 'warning')
             return redirect(url_for('auth.login'))
         
         # Check if branch exists
-        branch = Branch.query.get(branch_id)
+        branch = db.session.get(Branch, branch_id)
         if not branch:
             flash('Invalid branch selected.', 'danger')
             return redirect(url_for('auth.signup'))
@@ -57,7 +73,7 @@ def signup():
                 return redirect(url_for('auth.signup'))
         
         # Create new customer
-        hashed_password = generate_password_hash(password)
+        hashed_password = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         
         new_customer = Customer(
             email=email,
@@ -82,11 +98,11 @@ def signup():
             return redirect(url_for('auth.signup'))
     
     # GET request - show signup form
-    branches = Branch.query.all()
-    return render_template('signup.html', branches=branches)
+    return render_template('signup.html', branches=get_branches())
 
 
 @auth.route('/login', methods=['GET', 'POST'])
+@limiter.limit('10/minute', methods=['POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -101,17 +117,17 @@ def login():
             flash('Please provide both email and password.', 'danger')
             return redirect(url_for('auth.login'))
         
-        # Find user
-        customer = Customer.query.filter_by(email=email).first()
+        # Find active user (inactive accounts are treated as unknown)
+        customer = Customer.query.filter_by(email=email, is_active=True).first()
         
         # Check if user exists and password is correct
-        if not customer or not check_password_hash(customer.password_hash, password):
+        if not customer:
+            check_password_hash(DUMMY_PASSWORD_HASH, password)
             flash('Invalid email or password. Please try again.', 'danger')
             return redirect(url_for('auth.login'))
         
-        # Check if account is active
-        if not customer.is_active:
-            flash('Your account has been deactivated. Please contact support.', 'warning')
+        if not check_password_hash(customer.password_hash, password):
+            flash('Invalid email or password. Please try again.', 'danger')
             return redirect(url_for('auth.login'))
         
         # Login the user
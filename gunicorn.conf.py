@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration
+Loaded automatically by `gunicorn app:app` from the project root
+"""
+
+import os
+
+# Routes spend most of their time waiting on PostgreSQL, so each worker
+# serves several requests concurrently on threads instead of blocking
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Keep threads within SQLALCHEMY_ENGINE_OPTIONS['pool_size'] so every thread
+# can hold a connection without waiting on pool overflow
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 30
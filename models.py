@@ -1,25 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import JSONB
 
-db = SQLAlchemy()
+# Sessions are request-scoped, so skip the post-commit expiry and implicit flushes
+db = SQLAlchemy(session_options={'expire_on_commit': False, 'autoflush': False})
 
 class Branch(db.Model):
     __tablename__ = 'branches'
     
-    branch_id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, db.Identity(always=True), primary_key=True)
     branch_name = db.Column(db.String(100), nullable=False, unique=True)
     branch_code = db.Column(db.String(20), nullable=False, unique=True)
     address = db.Column(db.Text, nullable=False)
     phone = db.Column(db.String(20))
     manager_name = db.Column(db.String(100))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationships
-    customers = db.relationship('Customer', backref='branch', lazy=True)
-    employees = db.relationship('Employee', backref='branch', lazy=True)
-    accounts = db.relationship('Account', backref='branch', lazy=True)
+    customers = db.relationship('Customer', backref='branch', lazy='select')
+    employees = db.relationship('Employee', backref='branch', lazy='select')
+    accounts = db.relationship('Account', backref='branch', lazy='select')
     
     def __repr__(self):
         return f'<Branch {self.branch_name}>'
@@ -38,7 +39,7 @@ class Branch(db.Model):
 class Customer(UserMixin, db.Model):
     __tablename__ = 'customers'
     
-    customer_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.Identity(always=True), primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), nullable=False, unique=True)
@@ -48,26 +49,21 @@ class Customer(UserMixin, db.Model):
     date_of_birth = db.Column(db.Date)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.branch_id'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationships
-    accounts = db.relationship('Account', backref='customer', lazy=True, cascade='all, delete-orphan')
+    # The database cascades the deletes; the ORM only handles rows already loaded
+    accounts = db.relationship('Account', backref='customer', lazy='select',
+                               cascade='all, delete-orphan', passive_deletes=True)
+    
+    # Flask-Login required attributes (plain class constants, read on every request;
+    # is_active is the mapped column)
+    is_authenticated = True
+    is_anonymous = False
     
-    # Flask-Login required methods
     def get_id(self):
         return str(self.customer_id)
     
-    @property
-    def is_authenticated(self):
-        return True
-    
-    @property
-    def is_anonymous(self):
-        return False
-    
-    def get_active(self):
-        return self.is_active
-    
     def __repr__(self):
         return f'<Customer {self.first_name} {self.last_name}>'
     
@@ -88,17 +84,17 @@ class Customer(UserMixin, db.Model):
 class Employee(db.Model):
     __tablename__ = 'employees'
     
-    employee_id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.Identity(always=True), primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), nullable=False, unique=True)
     phone = db.Column(db.String(20))
     position = db.Column(db.String(50), nullable=False)
-    salary = db.Column(db.Numeric(12, 2))
+    salary = db.Column(db.BigInteger)
     hire_date = db.Column(db.Date, nullable=False)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.branch_id'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     def __repr__(self):
         return f'<Employee {self.first_name} {self.last_name} - {self.position}>'
@@ -120,26 +116,33 @@ class Employee(db.Model):
 class Account(db.Model):
     __tablename__ = 'accounts'
     
-    account_id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.BigInteger, db.Identity(always=True), primary_key=True)
     account_number = db.Column(db.String(20), nullable=False, unique=True)
-    account_type = db.Column(db.String(20), nullable=False)
-    balance = db.Column(db.Numeric(15, 2), default=0.00)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False)
+    account_type = db.Column(db.Enum('SAVINGS', 'CHECKING', 'FIXED_DEPOSIT', name='account_type_t'), nullable=False)
+    balance = db.Column(db.BigInteger, default=0)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id', ondelete='CASCADE'), nullable=False)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.branch_id'), nullable=False)
-    status = db.Column(db.String(20), default='ACTIVE')
-    opened_date = db.Column(db.Date, default=datetime.utcnow)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.Enum('ACTIVE', 'INACTIVE', 'FROZEN', name='account_status_t'), server_default='ACTIVE')
+    opened_date = db.Column(db.Date, server_default=db.func.current_date())
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    __table_args__ = (
+        db.Index('idx_accounts_customer_status', customer_id, status),
+    )
     
     # Relationships
     sent_transactions = db.relationship('Transaction', 
                                        foreign_keys='Transaction.sender_account_id',
                                        backref='sender_account', 
-                                       lazy=True)
+                                       lazy='select',
+                                       passive_deletes=True)
     received_transactions = db.relationship('Transaction', 
                                            foreign_keys='Transaction.receiver_account_id',
                                            backref='receiver_account', 
-                                           lazy=True)
-    audit_logs = db.relationship('AuditLog', backref='account', lazy=True, cascade='all, delete-orphan')
+                                           lazy='select',
+                                           passive_deletes=True)
+    audit_logs = db.relationship('AuditLog', backref='account', lazy='select',
+                                 cascade='all, delete-orphan', passive_deletes=True)
     
     def __repr__(self):
         return f'<Account {self.account_number} - Balance: {self.balance}>'
@@ -149,7 +152,7 @@ class Account(db.Model):
             'account_id': self.account_id,
             'account_number': self.account_number,
             'account_type': self.account_type,
-            'balance': float(self.balance) if self.balance else 0.00,
+            'balance': self.balance / 100 if self.balance else 0.00,
             'customer_id': self.customer_id,
             'branch_id': self.branch_id,
             'status': self.status,
@@ -160,14 +163,28 @@ class Account(db.Model):
 class Transaction(db.Model):
     __tablename__ = 'transactions'
     
-    transaction_id = db.Column(db.Integer, primary_key=True)
-    transaction_type = db.Column(db.String(20), nullable=False)
-    amount = db.Column(db.Numeric(15, 2), nullable=False)
-    sender_account_id = db.Column(db.Integer, db.ForeignKey('accounts.account_id'))
-    receiver_account_id = db.Column(db.Integer, db.ForeignKey('accounts.account_id'))
-    transaction_date = db.Column(db.DateTime, default=datetime.utcnow)
+    transaction_id = db.Column(db.BigInteger, autoincrement=True)
+    transaction_type = db.Column(db.Enum('TRANSFER', 'DEPOSIT', 'WITHDRAWAL', name='transaction_type_t'), nullable=False)
+    amount = db.Column(db.BigInteger, nullable=False)
+    sender_account_id = db.Column(db.BigInteger, db.ForeignKey('accounts.account_id', ondelete='SET NULL'))
+    receiver_account_id = db.Column(db.BigInteger, db.ForeignKey('accounts.account_id', ondelete='SET NULL'))
+    transaction_date = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
     description = db.Column(db.Text)
-    status = db.Column(db.String(20), default='COMPLETED')
+    status = db.Column(db.Enum('COMPLETED', 'PENDING', 'FAILED', name='transaction_status_t'), server_default='COMPLETED')
+    
+    # Newest-first per account; transaction_id is included so the dashboard's
+    # top-k legs are answered by index-only scans. The table is partitioned by
+    # month, so the partition key is part of the database primary key.
+    __table_args__ = (
+        db.PrimaryKeyConstraint(transaction_id, transaction_date),
+        db.Index('idx_tx_sender_date', sender_account_id, transaction_date.desc(),
+                 postgresql_include=['transaction_id']),
+        db.Index('idx_tx_receiver_date', receiver_account_id, transaction_date.desc(),
+                 postgresql_include=['transaction_id']),
+        {'postgresql_partition_by': 'RANGE (transaction_date)'},
+    )
+    # transaction_id alone still identifies a row
+    __mapper_args__ = {'primary_key': [transaction_id]}
     
     def __repr__(self):
         return f'<Transaction {self.transaction_id} - {self.transaction_type} - {self.amount}>'
@@ -176,7 +193,7 @@ class Transaction(db.Model):
         return {
             'transaction_id': self.transaction_id,
             'transaction_type': self.transaction_type,
-            'amount': float(self.amount) if self.amount else 0.00,
+            'amount': self.amount / 100 if self.amount else 0.00,
             'sender_account_id': self.sender_account_id,
             'receiver_account_id': self.receiver_account_id,
             'transaction_date': self.transaction_date.isoformat() if self.transaction_date else None,
@@ -188,13 +205,20 @@ class Transaction(db.Model):
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
     
-    log_id = db.Column(db.Integer, primary_key=True)
-    account_id = db.Column(db.Integer, db.ForeignKey('accounts.account_id'), nullable=False)
-    old_balance = db.Column(db.Numeric(15, 2))
-    new_balance = db.Column(db.Numeric(15, 2))
-    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    log_id = db.Column(db.BigInteger, autoincrement=True)
+    account_id = db.Column(db.BigInteger, db.ForeignKey('accounts.account_id', ondelete='CASCADE'), nullable=False)
+    old_balance = db.Column(db.BigInteger)
+    new_balance = db.Column(db.BigInteger)
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
     operation_type = db.Column(db.String(50))
     
+    __table_args__ = (
+        db.PrimaryKeyConstraint(log_id, changed_at),
+        db.Index('idx_audit_logs_account_changed', account_id, changed_at.desc()),
+        {'postgresql_partition_by': 'RANGE (changed_at)'},
+    )
+    __mapper_args__ = {'primary_key': [log_id]}
+    
     def __repr__(self):
         return f'<AuditLog {self.log_id} - Account {self.account_id}>'
     
@@ -202,8 +226,8 @@ class AuditLog(db.Model):
         return {
             'log_id': self.log_id,
             'account_id': self.account_id,
-            'old_balance': float(self.old_balance) if self.old_balance else 0.00,
-            'new_balance': float(self.new_balance) if self.new_balance else 0.00,
+            'old_balance': self.old_balance / 100 if self.old_balance else 0.00,
+            'new_balance': self.new_balance / 100 if self.new_balance else 0.00,
             'changed_at': self.changed_at.isoformat() if self.changed_at else None,
             'operation_type': self.operation_type
         }
@@ -212,16 +236,23 @@ class AuditLog(db.Model):
 class RecoveryLog(db.Model):
     __tablename__ = 'recovery_logs'
     
-    recovery_id = db.Column(db.Integer, primary_key=True)
+    recovery_id = db.Column(db.Integer, db.Identity(always=True), primary_key=True)
     operation_type = db.Column(db.String(50), nullable=False)
-    sender_account_id = db.Column(db.Integer)
-    receiver_account_id = db.Column(db.Integer)
-    attempted_amount = db.Column(db.Numeric(15, 2))
+    sender_account_id = db.Column(db.BigInteger)
+    receiver_account_id = db.Column(db.BigInteger)
+    attempted_amount = db.Column(db.BigInteger)
     failure_reason = db.Column(db.Text, nullable=False)
-    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
-    sender_balance_at_failure = db.Column(db.Numeric(15, 2))
+    failed_at = db.Column(db.DateTime, server_default=db.func.now())
+    sender_balance_at_failure = db.Column(db.BigInteger)
+    retry_count = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
+    # Schemaless extras only; keys that get filtered on belong in real columns
     additional_details = db.Column(JSONB)
     
+    __table_args__ = (
+        db.Index('idx_recovery_logs_details', additional_details,
+                 postgresql_using='gin', postgresql_ops={'additional_details': 'jsonb_path_ops'}),
+    )
+    
     def __repr__(self):
         return f'<RecoveryLog {self.recovery_id} - {self.operation_type}>'
     
@@ -231,9 +262,39 @@ class RecoveryLog(db.Model):
             'operation_type': self.operation_type,
             'sender_account_id': self.sender_account_id,
             'receiver_account_id': self.receiver_account_id,
-            'attempted_amount': float(self.attempted_amount) if self.attempted_amount else 0.00,
+            'attempted_amount': self.attempted_amount / 100 if self.attempted_amount else 0.00,
             'failure_reason': self.failure_reason,
             'failed_at': self.failed_at.isoformat() if self.failed_at else None,
-            'sender_balance_at_failure': float(self.sender_balance_at_failure) if self.sender_balance_at_failure else 0.00,
+            'sender_balance_at_failure': self.sender_balance_at_failure / 100 if self.sender_balance_at_failure else 0.00,
+            'retry_count': self.retry_count,
             'additional_details': self.additional_details
-        }
\ No newline at end of file
+        }
+
+# Read-only mapping of the mv_customer_balance materialized view. Its table
+# lives on its own MetaData so db.create_all() never creates it as a table.
+class CustomerBalance(db.Model):
+    __table__ = db.Table(
+        'mv_customer_balance', db.MetaData(),
+        db.Column('customer_id', db.Integer, primary_key=True),
+        db.Column('total_accounts', db.BigInteger),
+        db.Column('total_balance', db.BigInteger),
+        db.Column('last_updated', db.DateTime),
+    )
+    
+    def __repr__(self):
+        return f'<CustomerBalance {self.customer_id} - {self.total_balance}>'
+    
+    @classmethod
+    def refresh(cls):
+        # CONCURRENTLY keeps the view readable during the refresh; it relies on
+        # the unique index on customer_id
+        db.session.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY mv_customer_balance'))
+        db.session.commit()
+    
+    def to_dict(self):
+        return {
+            'customer_id': self.customer_id,
+            'total_accounts': self.total_accounts,
+            'total_balance': self.total_balance / 100 if self.total_balance else 0.00,
+            'last_updated': self.last_updated.isoformat() if self.last_updated else None
+        }
@@ -9,10 +9,13 @@ DROP TABLE IF EXISTS accounts CASCADE;
 DROP TABLE IF EXISTS employees CASCADE;
 DROP TABLE IF EXISTS customers CASCADE;
 DROP TABLE IF EXISTS branches CASCADE;
+DROP TYPE IF EXISTS account_type_t, account_status_t, transaction_type_t, transaction_status_t;
+DROP FUNCTION IF EXISTS transfer_funds(INTEGER, INTEGER, NUMERIC);
+DROP FUNCTION IF EXISTS transfer_funds(BIGINT, BIGINT, NUMERIC);
 
 -- 1. Branches Table
 CREATE TABLE branches (
-    branch_id SERIAL PRIMARY KEY,
+    branch_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     branch_name VARCHAR(100) NOT NULL UNIQUE,
     branch_code VARCHAR(20) NOT NULL UNIQUE,
     address TEXT NOT NULL,
@@ -23,7 +26,7 @@ CREATE TABLE branches (
 
 -- 2. Customers Table
 CREATE TABLE customers (
-    customer_id SERIAL PRIMARY KEY,
+    customer_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     first_name VARCHAR(50) NOT NULL,
     last_name VARCHAR(50) NOT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
@@ -41,13 +44,13 @@ CREATE TABLE customers (
 
 -- 3. Employees Table
 CREATE TABLE employees (
-    employee_id SERIAL PRIMARY KEY,
+    employee_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     first_name VARCHAR(50) NOT NULL,
     last_name VARCHAR(50) NOT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
     phone VARCHAR(20),
     position VARCHAR(50) NOT NULL,
-    salary NUMERIC(12, 2) CHECK (salary > 0),
+    salary BIGINT CHECK (salary > 0),
     hire_date DATE NOT NULL,
     branch_id INTEGER NOT NULL,
     is_active BOOLEAN DEFAULT TRUE,
@@ -56,34 +59,44 @@ CREATE TABLE employees (
         REFERENCES branches(branch_id) ON DELETE RESTRICT
 );
 
+-- Monetary columns below are BIGINT amounts in cents
+
+-- Native enums: 4 bytes per row and cheap equality instead of repeated strings
+CREATE TYPE account_type_t AS ENUM ('SAVINGS', 'CHECKING', 'FIXED_DEPOSIT');
+CREATE TYPE account_status_t AS ENUM ('ACTIVE', 'INACTIVE', 'FROZEN');
+CREATE TYPE transaction_type_t AS ENUM ('TRANSFER', 'DEPOSIT', 'WITHDRAWAL');
+CREATE TYPE transaction_status_t AS ENUM ('COMPLETED', 'PENDING', 'FAILED');
+
 -- 4. Accounts Table (with CHECK constraint for balance)
 CREATE TABLE accounts (
-    account_id SERIAL PRIMARY KEY,
+    account_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     account_number VARCHAR(20) NOT NULL UNIQUE,
-    account_type VARCHAR(20) NOT NULL CHECK (account_type IN ('SAVINGS', 'CHECKING', 'FIXED_DEPOSIT')),
-    balance NUMERIC(15, 2) DEFAULT 0.00,
+    account_type account_type_t NOT NULL,
+    balance BIGINT DEFAULT 0,
     customer_id INTEGER NOT NULL,
     branch_id INTEGER NOT NULL,
-    status VARCHAR(20) DEFAULT 'ACTIVE' CHECK (status IN ('ACTIVE', 'INACTIVE', 'FROZEN')),
+    status account_status_t DEFAULT 'ACTIVE',
     opened_date DATE DEFAULT CURRENT_DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_account_customer FOREIGN KEY (customer_id) 
         REFERENCES customers(customer_id) ON DELETE CASCADE,
     CONSTRAINT fk_account_branch FOREIGN KEY (branch_id) 
         REFERENCES branches(branch_id) ON DELETE RESTRICT,
-    CONSTRAINT chk_balance_non_negative CHECK (balance >= 0.00)
+    CONSTRAINT chk_balance_non_negative CHECK (balance >= 0)
 );
 
--- 5. Transactions Table
+-- 5. Transactions Table (range-partitioned by month on transaction_date)
+-- Partitioned tables keep BIGSERIAL: identity columns need PostgreSQL 17 there
 CREATE TABLE transactions (
-    transaction_id SERIAL PRIMARY KEY,
-    transaction_type VARCHAR(20) NOT NULL CHECK (transaction_type IN ('TRANSFER', 'DEPOSIT', 'WITHDRAWAL')),
-    amount NUMERIC(15, 2) NOT NULL CHECK (amount > 0),
-    sender_account_id INTEGER,
-    receiver_account_id INTEGER,
-    transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    transaction_id BIGSERIAL,
+    transaction_type transaction_type_t NOT NULL,
+    amount BIGINT NOT NULL CHECK (amount > 0),
+    sender_account_id BIGINT,
+    receiver_account_id BIGINT,
+    transaction_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     description TEXT,
-    status VARCHAR(20) DEFAULT 'COMPLETED' CHECK (status IN ('COMPLETED', 'PENDING', 'FAILED')),
+    status transaction_status_t DEFAULT 'COMPLETED',
+    PRIMARY KEY (transaction_id, transaction_date),
     CONSTRAINT fk_sender_account FOREIGN KEY (sender_account_id) 
         REFERENCES accounts(account_id) ON DELETE SET NULL,
     CONSTRAINT fk_receiver_account FOREIGN KEY (receiver_account_id) 
@@ -92,30 +105,100 @@ CREATE TABLE transactions (
         (transaction_type = 'TRANSFER' AND sender_account_id IS NOT NULL AND receiver_account_id IS NOT NULL AND sender_account_id != receiver_account_id)
         OR (transaction_type IN ('DEPOSIT', 'WITHDRAWAL'))
     )
-);
+) PARTITION BY RANGE (transaction_date);
 
--- 6. Audit Logs Table
+-- 6. Audit Logs Table (range-partitioned by month on changed_at)
 CREATE TABLE audit_logs (
-    log_id SERIAL PRIMARY KEY,
-    account_id INTEGER NOT NULL,
-    old_balance NUMERIC(15, 2),
-    new_balance NUMERIC(15, 2),
-    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    log_id BIGSERIAL,
+    account_id BIGINT NOT NULL,
+    old_balance BIGINT,
+    new_balance BIGINT,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     operation_type VARCHAR(50),
+    PRIMARY KEY (log_id, changed_at),
     CONSTRAINT fk_audit_account FOREIGN KEY (account_id) 
         REFERENCES accounts(account_id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (changed_at);
+
+-- Monthly partitions: create_monthly_partitions(table, first_month, count)
+-- adds one partition per month; rows outside them land in the DEFAULT
+-- partition. Run `flask create-partitions` monthly to stay ahead of the
+-- calendar. If a month's rows already sit in the DEFAULT partition they are
+-- moved into the new partition, since PostgreSQL refuses to create a
+-- partition whose range the DEFAULT partition already holds rows for.
+-- Old months are retired with a cheap DROP TABLE <table>_yYYYYmMM.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(
+    p_table TEXT,
+    p_start DATE,
+    p_months INTEGER
+)
+RETURNS VOID AS $$
+DECLARE
+    v_from DATE;
+    v_to DATE;
+    v_partition TEXT;
+    v_key TEXT;
+    v_default TEXT;
+    v_stray BOOLEAN;
+BEGIN
+    -- Partition key column, e.g. 'RANGE (changed_at)' -> 'changed_at'
+    v_key := substring(pg_get_partkeydef(p_table::regclass) FROM '\((.*)\)');
+    SELECT c.relname INTO v_default
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partdefid
+    WHERE pt.partrelid = p_table::regclass;
+    
+    FOR i IN 0..p_months - 1 LOOP
+        v_from := date_trunc('month', p_start)::DATE + make_interval(months => i);
+        v_to := v_from + INTERVAL '1 month';
+        v_partition := p_table || '_' || to_char(v_from, '"y"YYYY"m"MM');
+        
+        CONTINUE WHEN to_regclass(v_partition) IS NOT NULL;
+        
+        v_stray := FALSE;
+        IF v_default IS NOT NULL THEN
+            EXECUTE FORMAT('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                           v_default, v_key, v_from, v_key, v_to)
+            INTO v_stray;
+        END IF;
+        
+        IF v_stray THEN
+            -- Build the partition standalone, move the month's rows out of
+            -- DEFAULT, then attach it (indexes and FKs are added on attach)
+            EXECUTE FORMAT('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                           v_partition, p_table);
+            EXECUTE FORMAT('WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                           'INSERT INTO %I SELECT * FROM moved',
+                           v_default, v_key, v_from, v_key, v_to, v_partition);
+            EXECUTE FORMAT('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           p_table, v_partition, v_from, v_to);
+        ELSE
+            EXECUTE FORMAT('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           v_partition, p_table, v_from, v_to);
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+SELECT create_monthly_partitions('transactions', (CURRENT_DATE - INTERVAL '1 month')::DATE, 13);
+SELECT create_monthly_partitions('audit_logs', (CURRENT_DATE - INTERVAL '1 month')::DATE, 13);
+-- Once a month closes its partition stops changing; regroup it by account so
+-- per-account audit reads hit contiguous pages, e.g.
+--   CLUSTER audit_logs_y2025m01 USING audit_logs_y2025m01_account_id_changed_at_idx;
 
 -- 7. Recovery Logs Table
 CREATE TABLE recovery_logs (
-    recovery_id SERIAL PRIMARY KEY,
+    recovery_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     operation_type VARCHAR(50) NOT NULL,
-    sender_account_id INTEGER,
-    receiver_account_id INTEGER,
-    attempted_amount NUMERIC(15, 2),
+    sender_account_id BIGINT,
+    receiver_account_id BIGINT,
+    attempted_amount BIGINT,
     failure_reason TEXT NOT NULL,
     failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    sender_balance_at_failure NUMERIC(15, 2),
+    sender_balance_at_failure BIGINT,
+    retry_count SMALLINT NOT NULL DEFAULT 0,
     additional_details JSONB
 );
 
@@ -135,26 +218,31 @@ INSERT INTO customers (first_name, last_name, email, password_hash, phone, addre
 
 -- Insert Sample Employees
 INSERT INTO employees (first_name, last_name, email, phone, position, salary, hire_date, branch_id) VALUES
-('Emma', 'Wilson', 'emma.wilson@bank.com', '555-2001', 'Teller', 45000.00, '2020-01-15', 1),
-('David', 'Taylor', 'david.taylor@bank.com', '555-2002', 'Manager', 75000.00, '2018-06-01', 1),
-('Lisa', 'Anderson', 'lisa.anderson@bank.com', '555-2003', 'Loan Officer', 60000.00, '2019-03-20', 2);
+('Emma', 'Wilson', 'emma.wilson@bank.com', '555-2001', 'Teller', 4500000, '2020-01-15', 1),
+('David', 'Taylor', 'david.taylor@bank.com', '555-2002', 'Manager', 7500000, '2018-06-01', 1),
+('Lisa', 'Anderson', 'lisa.anderson@bank.com', '555-2003', 'Loan Officer', 6000000, '2019-03-20', 2);
 
--- Insert Sample Accounts
+-- Insert Sample Accounts (balances in cents)
 INSERT INTO accounts (account_number, account_type, balance, customer_id, branch_id) VALUES
-('ACC1001', 'SAVINGS', 5000.00, 1, 1),
-('ACC1002', 'CHECKING', 1500.00, 1, 1),
-('ACC2001', 'SAVINGS', 10000.00, 2, 1),
-('ACC3001', 'CHECKING', 3000.00, 3, 2),
-('ACC3002', 'SAVINGS', 500.00, 3, 2);
+('ACC1001', 'SAVINGS', 500000, 1, 1),
+('ACC1002', 'CHECKING', 150000, 1, 1),
+('ACC2001', 'SAVINGS', 1000000, 2, 1),
+('ACC3001', 'CHECKING', 300000, 3, 2),
+('ACC3002', 'SAVINGS', 50000, 3, 2);
 
 -- Create Indexes for Performance
-CREATE INDEX idx_accounts_customer ON accounts(customer_id);
+CREATE INDEX idx_accounts_customer_status ON accounts(customer_id, status);
 CREATE INDEX idx_accounts_branch ON accounts(branch_id);
-CREATE INDEX idx_transactions_sender ON transactions(sender_account_id);
-CREATE INDEX idx_transactions_receiver ON transactions(receiver_account_id);
 CREATE INDEX idx_transactions_date ON transactions(transaction_date);
-CREATE INDEX idx_audit_logs_account ON audit_logs(account_id);
+CREATE INDEX idx_tx_sender_date ON transactions(sender_account_id, transaction_date DESC) INCLUDE (transaction_id);
+CREATE INDEX idx_tx_receiver_date ON transactions(receiver_account_id, transaction_date DESC) INCLUDE (transaction_id);
+CREATE INDEX idx_audit_logs_account_changed ON audit_logs(account_id, changed_at DESC);
+CREATE INDEX idx_audit_logs_changed_at ON audit_logs(changed_at DESC);
+CREATE INDEX idx_recovery_logs_failed_at ON recovery_logs(failed_at DESC);
+-- jsonb_path_ops: smaller GIN index that serves @> containment lookups
+CREATE INDEX idx_recovery_logs_details ON recovery_logs USING GIN (additional_details jsonb_path_ops);
 CREATE INDEX idx_customers_email ON customers(email);
+CREATE INDEX idx_customers_email_active ON customers(email) WHERE is_active;
 CREATE INDEX idx_customers_branch ON customers(branch_id);
 
 -- A. AUDITING TRIGGER
@@ -172,31 +260,40 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Attach Trigger to accounts table
+-- (UPDATE OF balance: updates that do not touch balance skip the trigger entirely)
 CREATE TRIGGER trg_account_balance_audit
-BEFORE UPDATE ON accounts
+BEFORE UPDATE OF balance ON accounts
 FOR EACH ROW
 WHEN (OLD.balance IS DISTINCT FROM NEW.balance)
 EXECUTE FUNCTION log_account_update();
 
 -- B. ATOMIC TRANSFER STORED PROCEDURE WITH RECOVERY MECHANISM
 
+-- p_amount is in cents, like balances and logged amounts; the app converts
+-- the entered dollar amount exactly once
 CREATE OR REPLACE FUNCTION transfer_funds(
-    p_sender_account_id INTEGER,
-    p_receiver_account_id INTEGER,
-    p_amount NUMERIC
+    p_sender_account_id BIGINT,
+    p_receiver_account_id BIGINT,
+    p_amount BIGINT
 )
 RETURNS TEXT AS $$
 DECLARE
-    v_sender_balance NUMERIC;
+    v_sender_balance BIGINT;
     v_sender_account_number VARCHAR(20);
     v_receiver_account_number VARCHAR(20);
 BEGIN
-    -- Start transaction control
-    -- Get sender's current balance
+    -- Lock both rows in account_id order so opposing transfers (A->B, B->A)
+    -- queue on the same row instead of deadlocking
+    PERFORM 1
+    FROM accounts
+    WHERE account_id IN (p_sender_account_id, p_receiver_account_id)
+    ORDER BY account_id
+    FOR UPDATE;
+
+    -- Get sender's current balance (row already locked above)
     SELECT balance, account_number INTO v_sender_balance, v_sender_account_number
     FROM accounts
-    WHERE account_id = p_sender_account_id
-    FOR UPDATE; -- Lock the row for update
+    WHERE account_id = p_sender_account_id;
     
     -- Check if sender account exists
     IF NOT FOUND THEN
@@ -223,8 +320,7 @@ BEGIN
     -- Check if receiver account exists
     SELECT account_number INTO v_receiver_account_number
     FROM accounts
-    WHERE account_id = p_receiver_account_id
-    FOR UPDATE;
+    WHERE account_id = p_receiver_account_id;
     
     IF NOT FOUND THEN
         -- Log failure to recovery_logs
@@ -264,18 +360,19 @@ BEGIN
             p_receiver_account_id,
             p_amount,
             FORMAT('Insufficient funds. Required: %s, Available: %s, Shortfall: %s', 
-                   p_amount, v_sender_balance, (p_amount - v_sender_balance)),
+                   (p_amount / 100.0)::NUMERIC(15, 2), (v_sender_balance / 100.0)::NUMERIC(15, 2),
+                   ((p_amount - v_sender_balance) / 100.0)::NUMERIC(15, 2)),
             v_sender_balance,
             jsonb_build_object(
                 'sender_account', v_sender_account_number,
                 'receiver_account', v_receiver_account_number,
-                'deficit_amount', (p_amount - v_sender_balance)
+                'deficit_amount', ((p_amount - v_sender_balance) / 100.0)::NUMERIC(15, 2)
             )
         );
         
         -- Raise exception to rollback transaction
         RAISE EXCEPTION 'Insufficient funds in account %. Available: %, Required: %', 
-            v_sender_account_number, v_sender_balance, p_amount;
+            v_sender_account_number, (v_sender_balance / 100.0)::NUMERIC(15, 2), (p_amount / 100.0)::NUMERIC(15, 2);
     END IF;
     
     -- Perform the transfer (debit sender)
@@ -306,7 +403,7 @@ BEGIN
     );
     
     RETURN FORMAT('Transfer successful: %s transferred from account %s to account %s', 
-                  p_amount, v_sender_account_number, v_receiver_account_number);
+                  (p_amount / 100.0)::NUMERIC(15, 2), v_sender_account_number, v_receiver_account_number);
     
 EXCEPTION
     WHEN OTHERS THEN
@@ -334,6 +431,22 @@ $$ LANGUAGE plpgsql;
 
 -- REPORTING VIEWS
 
+-- Per-customer balance totals, precomputed so reports read one row per
+-- customer instead of aggregating every account. `flask refresh-balances`
+-- (REFRESH MATERIALIZED VIEW CONCURRENTLY, which needs the unique index below)
+-- runs every 5 minutes from the cron job in render.yaml, so report totals can
+-- trail live balances by that much.
+CREATE MATERIALIZED VIEW mv_customer_balance AS
+SELECT 
+    customer_id,
+    COUNT(*) AS total_accounts,
+    SUM(balance)::BIGINT AS total_balance,
+    CURRENT_TIMESTAMP::TIMESTAMP AS last_updated
+FROM accounts
+GROUP BY customer_id;
+
+CREATE UNIQUE INDEX idx_mv_customer_balance_customer ON mv_customer_balance(customer_id);
+
 -- 1. Customer Financial Overview View
 CREATE OR REPLACE VIEW customer_financial_overview AS
 SELECT 
@@ -342,13 +455,12 @@ SELECT
     c.email,
     c.phone,
     b.branch_name,
-    COUNT(a.account_id) AS total_accounts,
-    COALESCE(SUM(a.balance), 0.00) AS total_balance
+    COALESCE(m.total_accounts, 0) AS total_accounts,
+    COALESCE(m.total_balance, 0) AS total_balance
 FROM customers c
-LEFT JOIN accounts a ON c.customer_id = a.customer_id
+LEFT JOIN mv_customer_balance m ON c.customer_id = m.customer_id
 LEFT JOIN branches b ON c.branch_id = b.branch_id
 WHERE c.is_active = TRUE
-GROUP BY c.customer_id, c.first_name, c.last_name, c.email, c.phone, b.branch_name
 ORDER BY total_balance DESC;
 
 -- 2. Branch Transaction Summary View
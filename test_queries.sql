@@ -36,7 +36,7 @@ SELECT branch_id, branch_name, branch_code, manager_name FROM branches;
 SELECT customer_id, first_name, last_name, email, is_active FROM customers;
 \echo ''
 
-\echo 'Accounts:'
+\echo 'Accounts (balances in cents):'
 SELECT account_id, account_number, account_type, balance, customer_id FROM accounts;
 \echo ''
 
@@ -50,7 +50,7 @@ SELECT COUNT(*) as audit_count FROM audit_logs;
 \echo ''
 
 \echo 'Updating account balance to trigger audit log...'
-UPDATE accounts SET balance = balance + 100 WHERE account_number = 'ACC1001';
+UPDATE accounts SET balance = balance + 10000 WHERE account_number = 'ACC1001';
 \echo ''
 
 \echo 'New audit logs (should have new entry):'
@@ -61,7 +61,7 @@ LIMIT 3;
 \echo ''
 
 -- Revert the change
-UPDATE accounts SET balance = balance - 100 WHERE account_number = 'ACC1001';
+UPDATE accounts SET balance = balance - 10000 WHERE account_number = 'ACC1001';
 \echo ''
 
 -- ========================================
@@ -79,10 +79,14 @@ WHERE account_number IN ('ACC1001', 'ACC2001');
 SELECT transfer_funds(
     (SELECT account_id FROM accounts WHERE account_number = 'ACC1001'),
     (SELECT account_id FROM accounts WHERE account_number = 'ACC2001'),
-    100.00
+    10000  -- $100.00 in cents
 ) as result;
 \echo ''
 
+-- Report totals come from mv_customer_balance, refreshed on a schedule;
+-- refresh it here so section 6 reflects the transfer
+REFRESH MATERIALIZED VIEW CONCURRENTLY mv_customer_balance;
+
 \echo 'Account balances AFTER transfer:'
 SELECT account_number, balance 
 FROM accounts 
@@ -112,7 +116,7 @@ BEGIN
     PERFORM transfer_funds(
         (SELECT account_id FROM accounts WHERE account_number = 'ACC3002'),
         (SELECT account_id FROM accounts WHERE account_number = 'ACC1001'),
-        50000.00
+        5000000  -- $50,000.00 in cents
     );
 EXCEPTION
     WHEN OTHERS THEN
@@ -263,7 +267,7 @@ FROM recovery_logs
 UNION ALL
 SELECT 
     'Total System Balance', 
-    '$' || SUM(balance)::text 
+    '$' || (SUM(balance) / 100.0)::NUMERIC(15, 2)::text 
 FROM accounts;
 \echo ''
 